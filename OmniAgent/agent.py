@@ -11,18 +11,23 @@ Requires:
 """
 
 import asyncio
-import inspect
-import json
+import hashlib
+import importlib.metadata
+import logging
 import os
-import re
 import sys
-from datetime import datetime, timedelta
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-from openai import AzureOpenAI
+from openai import NOT_GIVEN, AsyncAzureOpenAI
 
 load_dotenv()
 
@@ -30,19 +35,27 @@ load_dotenv()
 # Azure OpenAI Configuration
 # ---------------------------------------------------------------------------
 
-client = AzureOpenAI(
+client = AsyncAzureOpenAI(
     api_key=os.getenv("AZURE_OPENAI_API_KEY"),
     api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-preview"),
     azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
 )
 DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
 
+# Set OMNI_LOG=DEBUG to dump intermediate objects via print_object
+log = logging.getLogger("omniagent")
+try:
+    log.setLevel(os.getenv("OMNI_LOG", "INFO").upper())
+except ValueError:
+    # Unknown level name: fall back to the default instead of failing at import
+    log.setLevel(logging.INFO)
 
-def serialize_to_json(obj: object) -> str:
+
+def serialize_to_json(obj: object, pretty: bool = False) -> str:
     """Serialize any object to a JSON string.
 
     Handles non-serializable types (datetime, set, bytes, custom objects)
-    via a fallback encoder.
+    via a fallback encoder. Set ``pretty`` for two-space indented output.
     """
     def default(o):
         if isinstance(o, (datetime,)):
@@ -55,33 +68,36 @@ def serialize_to_json(obj: object) -> str:
             return o.__dict__
         return str(o)
 
-    return json.dumps(obj, default=default, ensure_ascii=False)
+    option = orjson.OPT_NON_STR_KEYS
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=default, option=option).decode()
 
-def print_object(obj: object):
-    frame = inspect.currentframe().f_back
-    call_line = inspect.getframeinfo(frame).code_context[0].strip()
-    match = re.search(r'print_object\((.+)\)', call_line)
-    var_name = match.group(1).strip() if match else type(obj).__qualname__
+def print_object(name: str, obj: object):
+    """Dump an object as pretty JSON when debug logging is enabled."""
+    if not log.isEnabledFor(logging.DEBUG):
+        return
     print("Start "+"@" * 80)
-    print(var_name)
-    raw = serialize_to_json(obj)
-    try:
-        parsed = json.loads(raw)
-        print(json.dumps(parsed, indent=2, ensure_ascii=False))
-    except (json.JSONDecodeError, TypeError):
-        print(raw)
+    print(name)
+    print(serialize_to_json(obj, pretty=True))
     print("End "+"@" * 80)
     print()
-    
 
 
+@lru_cache(maxsize=2)
+def build_system_prompt(today: str) -> str:
+    """Build the system prompt for a given ISO date (YYYY-MM-DD).
 
-SYSTEM_PROMPT = f"""You are OmniAgent, a helpful multi-domain personal assistant.
+    Cached per date, so the prompt is formatted once a day and still picks
+    up the new date when a long-running session crosses midnight.
+    """
+    tomorrow = (date.fromisoformat(today) + timedelta(days=1)).isoformat()
+    return f"""You are OmniAgent, a helpful multi-domain personal assistant.
 You have access to tools for weather, currency conversion, member lookup,
 flight search/booking, and movie search/booking.
 
-Today's date is {datetime.now().strftime('%Y-%m-%d')}.
-Tomorrow's date is {(datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')}.
+Today's date is {today}.
+Tomorrow's date is {tomorrow}.
 
 When a user mentions "tomorrow", use tomorrow's date in YYYY-MM-DD format.
 
@@ -93,7 +109,160 @@ IMPORTANT REASONING INSTRUCTIONS:
 5. Think step by step and explain your reasoning.
 """
 
-print_object(SYSTEM_PROMPT)
+# History bounds: once the conversation exceeds MAX_HISTORY_MESSAGES, tool
+# results older than the last KEEP_RECENT_TURNS user turns are replaced by a
+# one-line stub so the prompt stops growing with every tool round.
+MAX_HISTORY_MESSAGES = 20
+KEEP_RECENT_TURNS = 2
+# An identical (tool, args) call issued this many times in one turn is a loop
+MAX_REPEATED_TOOL_CALLS = 3
+# Upper bound on MCP tool calls in flight at once, guarding against runaway fanout
+MAX_CONCURRENT_TOOL_CALLS = 8
+_TOOL_SEM = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+# Converted OpenAI tool schemas are cached here between agent runs; bump the
+# version whenever the cache file layout changes
+TOOL_CACHE_DIR = Path.home() / ".cache" / "omniagent"
+TOOL_CACHE_VERSION = "2"
+
+
+def prune_history(messages: list[dict]) -> None:
+    """Stub out stale tool results in place to cap prompt size.
+
+    The assistant tool_call messages are kept intact so every tool message
+    still pairs with the call that produced it.
+    """
+    if len(messages) <= MAX_HISTORY_MESSAGES:
+        return
+    user_turns = [i for i, m in enumerate(messages) if m["role"] == "user"]
+    if len(user_turns) <= KEEP_RECENT_TURNS:
+        return
+    cutoff = user_turns[-KEEP_RECENT_TURNS]
+    for m in messages[1:cutoff]:
+        if m["role"] == "tool" and not m["content"].startswith("[pruned]"):
+            first_line = m["content"].split("\n", 1)[0]
+            m["content"] = f"[pruned] {first_line[:100]}"
+
+
+def tool_cache_path(server_params: StdioServerParameters) -> Path:
+    """Return the on-disk tool schema cache file for an MCP server.
+
+    The file name is keyed on the server script contents, its interpreter
+    and launch arguments, and the installed mcp version, so editing
+    mcp_server.py, switching venvs, or upgrading the SDK invalidates the cache.
+    """
+    digest = hashlib.sha256(TOOL_CACHE_VERSION.encode())
+    digest.update(importlib.metadata.version("mcp").encode())
+    digest.update(server_params.command.encode())
+    for arg in server_params.args:
+        digest.update(arg.encode())
+        script = Path(server_params.cwd or ".", arg)
+        if script.suffix == ".py" and script.is_file():
+            digest.update(script.read_bytes())
+    return TOOL_CACHE_DIR / f"tools-{digest.hexdigest()}.json"
+
+
+def load_tool_cache(path: Path) -> dict | None:
+    """Read a tool schema cache file, or return None if it is missing, unreadable or malformed."""
+    try:
+        cache = orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if not (
+        isinstance(cache, dict)
+        and isinstance(cache.get("tools"), list)
+        and isinstance(cache.get("output_schemas"), dict)
+    ):
+        return None
+    return cache
+
+
+def save_tool_cache(path: Path, cache: dict) -> None:
+    """Atomically write a tool schema cache file; failures only skip caching."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(orjson.dumps(cache))
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def seed_output_schemas(session: ClientSession, output_schemas: dict) -> bool:
+    """Prime the session's tool output schemas from the cache.
+
+    call_tool() runs list_tools() itself to validate results unless the
+    session already knows each tool's output schema. That map is private
+    SDK state, so return False when it is not there and let the caller
+    fall back to discovery.
+    """
+    known = getattr(session, "_tool_output_schemas", None)
+    if not isinstance(known, dict):
+        return False
+    known.update(output_schemas)
+    return True
+
+
+def start_tool_call(session: ClientSession, call: dict, call_counts: Counter) -> asyncio.Task | str:
+    """Start executing a fully streamed tool call via MCP in the background.
+
+    ``call`` holds the accumulated ``id``, ``name`` and ``arguments`` deltas.
+    Calls with malformed arguments, or identical calls repeated
+    MAX_REPEATED_TOOL_CALLS times, are not executed; the error message to
+    send back as their tool result is returned instead of a task.
+    """
+    fn_name = call["name"]
+    try:
+        fn_args = orjson.loads(call["arguments"] or "{}")
+    except orjson.JSONDecodeError as e:
+        print(f"\n  [Tool Call] {fn_name}({call['arguments']}) - invalid arguments")
+        return f"Error calling {fn_name}: arguments are not valid JSON: {e}"
+    print(f"\n  [Tool Call] {fn_name}({fn_args})")
+    key = (fn_name, orjson.dumps(fn_args, option=orjson.OPT_SORT_KEYS))
+    call_counts[key] += 1
+    if call_counts[key] >= MAX_REPEATED_TOOL_CALLS:
+        print(f"  [Loop Detected] {fn_name} repeated with identical arguments")
+        return (
+            f"Error calling {fn_name}: already called {call_counts[key] - 1} times "
+            "with the same arguments. Stop retrying and answer with the results you have."
+        )
+    return asyncio.create_task(_call_tool(session, fn_name, fn_args))
+
+
+async def _call_tool(session: ClientSession, fn_name: str, fn_args: dict):
+    """Execute one MCP tool call, bounded by MAX_CONCURRENT_TOOL_CALLS."""
+    async with _TOOL_SEM:
+        return await session.call_tool(fn_name, fn_args)
+
+
+async def ainput(prompt: str) -> str:
+    """Read a line from stdin without blocking the event loop.
+
+    input() runs on a daemon thread rather than the default executor, so an
+    interrupted read never keeps asyncio.run from shutting down.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result: str | None, error: BaseException | None) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def read() -> None:
+        try:
+            line, error = input(prompt), None
+        except BaseException as e:
+            line, error = None, e
+        try:
+            loop.call_soon_threadsafe(resolve, line, error)
+        except RuntimeError:
+            pass  # Loop already closed; nobody is waiting for this line
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
 
 
 async def run_agent():
@@ -104,47 +273,64 @@ async def run_agent():
         args=["mcp_server.py"],
         cwd=os.path.dirname(os.path.abspath(__file__)),
     )
-    print_object(server_params)
+    print_object("server_params", server_params)
 
     async with stdio_client(server_params) as (read, write):
         async with ClientSession(read, write) as session:
             await session.initialize()
 
-            # Discover available tools from MCP server
-            tools_result = await session.list_tools()
-            print_object(tools_result)
-            mcp_tools = tools_result.tools
-            print_object(mcp_tools)
-
-            # Convert MCP tool schemas to OpenAI function format
-            openai_tools = []
-            for tool in mcp_tools:
-                openai_tools.append({
-                    "type": "function",
-                    "function": {
-                        "name": tool.name,
-                        "description": tool.description or "",
-                        "parameters": tool.inputSchema if tool.inputSchema else {"type": "object", "properties": {}},
-                    },
-                })
-            print_object(openai_tools)
+            # Load the converted tool schemas from disk when the MCP server is
+            # unchanged; otherwise discover them and refresh the cache
+            cache_path = tool_cache_path(server_params)
+            cache = load_tool_cache(cache_path)
+            if cache is not None and not seed_output_schemas(session, cache["output_schemas"]):
+                cache = None
+            if cache is None:
+                # Discover available tools from MCP server
+                tools_result = await session.list_tools()
+                print_object("tools_result", tools_result)
+                mcp_tools = tools_result.tools
+                print_object("mcp_tools", mcp_tools)
+
+                # Convert MCP tool schemas to OpenAI function format
+                cache = {
+                    "tools": [
+                        {
+                            "type": "function",
+                            "function": {
+                                "name": tool.name,
+                                "description": tool.description or "",
+                                "parameters": tool.inputSchema if tool.inputSchema else {"type": "object", "properties": {}},
+                            },
+                        }
+                        for tool in mcp_tools
+                    ],
+                    "output_schemas": {tool.name: tool.outputSchema for tool in mcp_tools},
+                }
+                save_tool_cache(cache_path, cache)
+
+            # Built once per session and reused by reference on every LLM call
+            openai_tools = tuple(cache["tools"])
+            print_object("openai_tools", openai_tools)
             print("=" * 60)
             print("  OmniAgent - Multi-Domain AI Assistant")
             print("  Powered by Azure OpenAI + MCP")
-            print(f"  Available tools: {[t.name for t in mcp_tools]}")
+            print(f"  Available tools: {[t['function']['name'] for t in openai_tools]}")
             print("=" * 60)
             print()
             print("Type your request (or 'quit' to exit):")
             print()
 
-            messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-            print_object(messages)
+            messages = [{"role": "system", "content": build_system_prompt(date.today().isoformat())}]
+            print_object("messages", messages)
 
             while True:
                 print("Start first while")
                 try:
-                    user_input = input("You: ").strip()
-                except (EOFError, KeyboardInterrupt):
+                    # Read stdin off the event loop so MCP I/O keeps progressing
+                    user_input = (await ainput("You: ")).strip()
+                except (EOFError, KeyboardInterrupt, asyncio.CancelledError):
+                    # asyncio.run turns Ctrl+C into cancellation of this task
                     print("\nGoodbye!")
                     break
 
@@ -154,62 +340,137 @@ async def run_agent():
                     print("Goodbye!")
                     break
 
+                # Refresh "today" in case the session has crossed midnight
+                system_prompt = build_system_prompt(date.today().isoformat())
+                if messages[0]["content"] is not system_prompt:
+                    messages[0] = {"role": "system", "content": system_prompt}
+                    print_object("system_prompt", system_prompt)
                 messages.append({"role": "user", "content": user_input})
-                print_object(messages)
+                print_object("messages", messages)
+                call_counts = Counter()
+                loop_detected = False
 
                 # ReAct loop: keep calling LLM until it stops requesting tools
                 while True:
                     print("Start 2nd while - calling LLM for response and tool calls")
-                    response = client.chat.completions.create(
+                    stream = await client.chat.completions.create(
                         model=DEPLOYMENT,
                         messages=messages,
                         tools=openai_tools if openai_tools else None,
+                        # Force a text answer once the model starts looping
+                        tool_choice="none" if loop_detected and openai_tools else NOT_GIVEN,
                         temperature=0.3,
+                        stream=True,
                     )
-                    print("LLM response received:")
-                    print_object(response)
 
-                    choice = response.choices[0]
-                    print_object(choice)
-                    message = choice.message
-                    print_object(message)
+                    # Print text as it arrives and start each tool call as soon
+                    # as it is fully streamed, while the LLM is still generating
+                    content_parts = []
+                    tool_calls = {}  # index -> {"id", "name", "arguments"}
+                    tasks = {}       # index -> running MCP call, or error text
+                    try:
+                        # Closing the stream releases the HTTP response even on failure
+                        async with stream:
+                            async for chunk in stream:
+                                if not chunk.choices:
+                                    continue
+                                delta = chunk.choices[0].delta
+                                if delta.content:
+                                    if not content_parts:
+                                        print("\nAgent: ", end="")
+                                    print(delta.content, end="", flush=True)
+                                    content_parts.append(delta.content)
+                                for tc in delta.tool_calls or ():
+                                    if tc.index not in tool_calls:
+                                        # A new index means all earlier calls are complete
+                                        for i in sorted(tool_calls.keys() - tasks.keys()):
+                                            tasks[i] = start_tool_call(session, tool_calls[i], call_counts)
+                                        tool_calls[tc.index] = {"id": "", "name": "", "arguments": ""}
+                                    call = tool_calls[tc.index]
+                                    if tc.id:
+                                        call["id"] = tc.id
+                                    if tc.function and tc.function.name:
+                                        call["name"] += tc.function.name
+                                    if tc.function and tc.function.arguments:
+                                        call["arguments"] += tc.function.arguments
+                        for i in sorted(tool_calls.keys() - tasks.keys()):
+                            tasks[i] = start_tool_call(session, tool_calls[i], call_counts)
+                    except BaseException:
+                        # Don't leave started tool calls running unowned when the
+                        # stream fails: cancel them and wait for them to settle
+                        running = [t for t in tasks.values() if isinstance(t, asyncio.Task)]
+                        for task in running:
+                            task.cancel()
+                        await asyncio.gather(*running, return_exceptions=True)
+                        raise
+                    if content_parts:
+                        print("\n")
+
+                    # Lean assistant message: only the fields the next request needs,
+                    # omitting the null content of pure tool-call turns
+                    message = {"role": "assistant"}
+                    if content_parts or not tool_calls:
+                        message["content"] = "".join(content_parts)
+                    print("LLM response received:")
+                    print_object("message", message)
 
                     # If the model wants to call tools
-                    if message.tool_calls:
+                    if tool_calls:
                         # Add assistant message with tool calls
                         print("Enter message.tool_call-  model wants to call tools")
-                        messages.append(message.model_dump())
-
-                        for tool_call in message.tool_calls:
-                            fn_name = tool_call.function.name
-                            fn_args = json.loads(tool_call.function.arguments)
-
-                            print(f"\n  [Tool Call] {fn_name}({fn_args})")
-
-                            # Execute via MCP
-                            try:
-                                result = await session.call_tool(fn_name, fn_args)
-                                tool_result = result.content[0].text if result.content else "No result"
-                            except Exception as e:
-                                tool_result = f"Error calling {fn_name}: {e}"
-
-                            print(f"  [Result] {tool_result[:200]}{'...' if len(tool_result) > 200 else ''}")
+                        calls = [tool_calls[i] for i in sorted(tool_calls)]
+                        message["tool_calls"] = [
+                            {
+                                "id": call["id"],
+                                "type": "function",
+                                "function": {"name": call["name"], "arguments": call["arguments"]},
+                            }
+                            for call in calls
+                        ]
+                        messages.append(message)
+                        loop_detected = any(n >= MAX_REPEATED_TOOL_CALLS for n in call_counts.values())
+
+                        # Wait for the concurrently running tool calls
+                        outcomes = [tasks[i] for i in sorted(tool_calls)]
+                        running = [o for o in outcomes if isinstance(o, asyncio.Task)]
+                        await asyncio.gather(*running, return_exceptions=True)
+
+                        # Append tool results in the original call order
+                        log_results = log.isEnabledFor(logging.INFO)
+                        for call, outcome in zip(calls, outcomes):
+                            fn_name = call["name"]
+                            if isinstance(outcome, str):
+                                # Rejected before execution; outcome is the error text
+                                tool_result = outcome
+                            else:
+                                try:
+                                    content = outcome.result().content
+                                    tool_result = content[0].text if content else "No result"
+                                except Exception as e:
+                                    tool_result = f"Error calling {fn_name}: {e}"
+
+                            if log_results:
+                                print(f"  [Result] {tool_result[:200]}{'...' if len(tool_result) > 200 else ''}")
 
                             messages.append({
                                 "role": "tool",
-                                "tool_call_id": tool_call.id,
+                                "tool_call_id": call["id"],
                                 "content": tool_result,
                             })
-                            print_object(messages)
+                            print_object("messages", messages)
                     else:
                         print("Model has no tool calls, breaking out of tool call loop")
-                        # Model produced a final text response
-                        print(f"\nAgent: {message.content}\n")
-                        messages.append({"role": "assistant", "content": message.content})
+                        # Model produced a final text response, already streamed
+                        messages.append(message)
+                        prune_history(messages)
                         break
                     print("End 2nd while - back to top of tool call loop")
                 print("End first while - back to top of user input loop")    
 
 
 if __name__ == "__main__":
-    asyncio.run(run_agent())
+    try:
+        asyncio.run(run_agent())
+    except KeyboardInterrupt:
+        # Ctrl+C outside the input prompt (or on Python < 3.11)
+        print("\nGoodbye!")
@@ -8,31 +8,88 @@ Run with:  python mcp_server.py
 Requires services.py to be running on port 8000.
 """
 
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 
 mcp = FastMCP("OmniAgent", instructions="A multi-domain personal assistant with tools for weather, currency, member lookup, flights, and movies.")
 
 API_BASE = "http://localhost:8000"
 
-# Session state for cross-tool context
-session_state: dict = {}
+# Session state for cross-tool context, scoped to each connected client
+# session so concurrent agents sharing this server never see each other's state
+_session_states: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def _session_state(ctx: Context) -> dict:
+    """Helper: return the state dict for the calling client session."""
+    return _session_states.setdefault(ctx.session, {})
+
+
+# Shared connection pool, reused across tool calls. HTTP/2 is negotiated via
+# ALPN for https:// bases, multiplexing parallel calls over one connection;
+# the plain-http localhost default stays on HTTP/1.1.
+_http = httpx.AsyncClient(
+    base_url=API_BASE,
+    http2=True,
+    timeout=10,
+    limits=httpx.Limits(max_keepalive_connections=32),
+)
 
 
-def _get(path: str, params: dict) -> dict:
+async def _get(path: str, params: dict) -> dict:
     """Helper: call the mock service API."""
-    with httpx.Client(timeout=10) as client:
-        resp = client.get(f"{API_BASE}{path}", params=params)
-        resp.raise_for_status()
-        return resp.json()
+    resp = await _http.get(path, params=params)
+    resp.raise_for_status()
+    return resp.json()
 
 
-def _post(path: str, params: dict) -> dict:
+async def _post(path: str, params: dict) -> dict:
     """Helper: call mock service POST endpoint."""
-    with httpx.Client(timeout=10) as client:
-        resp = client.post(f"{API_BASE}{path}", params=params)
-        resp.raise_for_status()
-        return resp.json()
+    resp = await _http.post(path, params=params)
+    resp.raise_for_status()
+    return resp.json()
+
+
+# Per-tool response TTLs in seconds (0 disables caching)
+TOOL_TTL = {
+    "convert_currency": 3600,
+    "member_lookup": 600,
+    "get_weather": 30,
+    "flight_search": 0,
+    "movie_search": 300,
+}
+CACHE_MAX_ENTRIES = 1024
+
+# key -> (expiry_ts, response), kept in LRU order
+_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+
+async def _cached_get(tool: str, path: str, params: dict) -> dict:
+    """Helper: _get with a per-tool TTL cache for deterministic lookups."""
+    ttl = TOOL_TTL.get(tool, 0)
+    if ttl <= 0:
+        return await _get(path, params)
+
+    key = hashlib.blake2b(f"{tool}:{json.dumps(params, sort_keys=True)}".encode()).hexdigest()
+    now = time.time()
+    hit = _cache.get(key)
+    if hit is not None:
+        if hit[0] > now:
+            _cache.move_to_end(key)
+            return hit[1]
+        del _cache[key]
+
+    data = await _get(path, params)
+    _cache[key] = (now + ttl, data)
+    if len(_cache) > CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+    return data
 
 
 # ---------------------------------------------------------------------------
@@ -40,7 +97,7 @@ def _post(path: str, params: dict) -> dict:
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
-def get_weather(location: str) -> str:
+async def get_weather(location: str) -> str:
     """Get the current weather for a city or location.
 
     Args:
@@ -50,7 +107,7 @@ def get_weather(location: str) -> str:
         A summary of current weather conditions including temperature,
         humidity, wind speed, and sky condition.
     """
-    data = _get("/weather", {"location": location})
+    data = await _cached_get("get_weather", "/weather", {"location": location})
     return (
         f"Weather in {data['location']}:\n"
         f"  Temperature: {data['temperature_c']}°C\n"
@@ -61,7 +118,7 @@ def get_weather(location: str) -> str:
 
 
 @mcp.tool()
-def convert_currency(from_currency: str, to_currency: str, amount: float) -> str:
+async def convert_currency(from_currency: str, to_currency: str, amount: float) -> str:
     """Convert an amount from one currency to another.
 
     Supported currencies: USD, EUR, GBP, INR, JPY.
@@ -74,7 +131,7 @@ def convert_currency(from_currency: str, to_currency: str, amount: float) -> str
     Returns:
         The converted amount with the exchange rate used.
     """
-    data = _get("/convert", {
+    data = await _cached_get("convert_currency", "/convert", {
         "from_currency": from_currency,
         "to_currency": to_currency,
         "amount": amount,
@@ -89,7 +146,7 @@ def convert_currency(from_currency: str, to_currency: str, amount: float) -> str
 
 
 @mcp.tool()
-def member_lookup(email: str) -> str:
+async def member_lookup(email: str, ctx: Context) -> str:
     """Look up a loyalty program member by their email address.
 
     This retrieves the member's name, ID, tier (Gold/Silver/Platinum),
@@ -102,9 +159,10 @@ def member_lookup(email: str) -> str:
         Member profile information. The member_id from this result
         should be used in subsequent booking calls.
     """
-    data = _get("/member", {"email": email})
+    data = await _cached_get("member_lookup", "/member", {"email": email})
     # Store in session for cross-tool context
     if data["member_id"] != "N/A":
+        session_state = _session_state(ctx)
         session_state["member_id"] = data["member_id"]
         session_state["member_name"] = data["name"]
         session_state["member_tier"] = data["tier"]
@@ -120,7 +178,7 @@ def member_lookup(email: str) -> str:
 
 
 @mcp.tool()
-def flight_search(origin: str, destination: str, date: str) -> str:
+async def flight_search(origin: str, destination: str, date: str) -> str:
     """Search for available flights between two cities on a specific date.
 
     Args:
@@ -132,7 +190,7 @@ def flight_search(origin: str, destination: str, date: str) -> str:
         A list of available flights with flight IDs, airlines, times, and prices.
         Use the flight_id from these results to book via the book_flight tool.
     """
-    data = _get("/flights", {"origin": origin, "destination": destination, "date": date})
+    data = await _cached_get("flight_search", "/flights", {"origin": origin, "destination": destination, "date": date})
     lines = [f"Flights from {data['origin']} to {data['destination']} on {data['date']}:\n"]
     for f in data["flights"]:
         lines.append(
@@ -144,7 +202,7 @@ def flight_search(origin: str, destination: str, date: str) -> str:
 
 
 @mcp.tool()
-def book_flight(flight_id: str, member_id: str) -> str:
+async def book_flight(flight_id: str, member_id: str) -> str:
     """Book a specific flight for a loyalty program member.
 
     Args:
@@ -154,7 +212,7 @@ def book_flight(flight_id: str, member_id: str) -> str:
     Returns:
         A booking confirmation with a confirmation code and status.
     """
-    data = _post("/book_flight", {"flight_id": flight_id, "member_id": member_id})
+    data = await _post("/book_flight", {"flight_id": flight_id, "member_id": member_id})
     return (
         f"Booking Confirmed!\n"
         f"  Confirmation Code: {data['confirmation_code']}\n"
@@ -165,7 +223,7 @@ def book_flight(flight_id: str, member_id: str) -> str:
 
 
 @mcp.tool()
-def movie_search(genre: str) -> str:
+async def movie_search(genre: str) -> str:
     """Search for currently playing movies by genre.
 
     Available genres: sci-fi, action, comedy, drama.
@@ -177,7 +235,7 @@ def movie_search(genre: str) -> str:
         A list of currently playing movies with IDs, titles, ratings, and showtimes.
         Use the movie_id from these results to book via the book_movie tool.
     """
-    data = _get("/movies", {"genre": genre})
+    data = await _cached_get("movie_search", "/movies", {"genre": genre})
     if not data["movies"]:
         return f"No movies found for genre: {genre}. Try: sci-fi, action, comedy, drama."
     lines = [f"Movies playing ({data['genre']}):\n"]
@@ -191,7 +249,7 @@ def movie_search(genre: str) -> str:
 
 
 @mcp.tool()
-def book_movie(movie_id: str, seats: int) -> str:
+async def book_movie(movie_id: str, seats: int) -> str:
     """Book movie tickets for a specific movie.
 
     Args:
@@ -201,7 +259,7 @@ def book_movie(movie_id: str, seats: int) -> str:
     Returns:
         A digital ticket stub with ticket ID, seat count, total price, and status.
     """
-    data = _post("/book_movie", {"movie_id": movie_id, "seats": seats})
+    data = await _post("/book_movie", {"movie_id": movie_id, "seats": seats})
     return (
         f"Movie Tickets Booked!\n"
         f"  Ticket ID: {data['ticket_id']}\n"
@@ -213,12 +271,13 @@ def book_movie(movie_id: str, seats: int) -> str:
 
 
 @mcp.tool()
-def get_session_context() -> str:
+def get_session_context(ctx: Context) -> str:
     """Retrieve the current session context (previously looked-up member info, etc.).
 
     Returns:
         Any stored session state from previous tool calls in this session.
     """
+    session_state = _session_state(ctx)
     if not session_state:
         return "No session context available. Use member_lookup first."
     lines = ["Current Session Context:"]
@@ -5,14 +5,17 @@ A FastAPI-based suite of REST endpoints simulating real-world data
 for Weather, Finance, Identity, Travel, and Cinema domains.
 """
 
+import os
 import random
-import string
+import secrets
 from datetime import datetime
 
+import numpy as np
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
-app = FastAPI(title="OmniAgent Mock Services", version="1.0.0")
+app = FastAPI(title="OmniAgent Mock Services", version="1.0.0", default_response_class=ORJSONResponse)
 
 # ---------------------------------------------------------------------------
 # Response Models
@@ -100,6 +103,8 @@ MEMBERS = {
 
 AIRLINES = ["SkyWay Airlines", "AeroConnect", "GlobalJet"]
 
+MINUTES = ["00", "15", "30", "45"]
+
 CONDITIONS = ["Sunny", "Partly Cloudy", "Cloudy", "Rainy", "Thunderstorm", "Snowy", "Windy", "Clear"]
 
 MOVIES = {
@@ -122,23 +127,37 @@ MOVIES = {
     ],
 }
 
+# Static catalog validated once at import and reused by every search
+MOVIE_MODELS = {
+    genre: [Movie(genre=genre, **m) for m in movies]
+    for genre, movies in MOVIES.items()
+}
+
+# Dedicated RNG with bound methods to skip module-level attribute lookups
+_rng = random.Random()
+_uniform = _rng.uniform
+_randint = _rng.randint
+_choice = _rng.choice
+# NumPy generator for batched per-flight draws in search_flights
+_np_rng = np.random.default_rng()
+
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
 
-@app.get("/weather", response_model=WeatherResponse)
+@app.get("/weather", responses={200: {"model": WeatherResponse}})
 def get_weather(location: str):
     """Return randomized weather data for a given location."""
     return WeatherResponse(
         location=location,
-        temperature_c=round(random.uniform(-5, 42), 1),
-        condition=random.choice(CONDITIONS),
-        humidity=random.randint(20, 95),
-        wind_kph=round(random.uniform(0, 60), 1),
-    )
+        temperature_c=round(_uniform(-5, 42), 1),
+        condition=_choice(CONDITIONS),
+        humidity=_randint(20, 95),
+        wind_kph=round(_uniform(0, 60), 1),
+    ).model_dump()
 
 
-@app.get("/convert", response_model=CurrencyResponse)
+@app.get("/convert", responses={200: {"model": CurrencyResponse}})
 def convert_currency(from_currency: str, to_currency: str, amount: float):
     """Convert currency using hardcoded exchange rates."""
     key = (from_currency.upper(), to_currency.upper())
@@ -150,78 +169,99 @@ def convert_currency(from_currency: str, to_currency: str, amount: float):
             amount=amount,
             converted=0.0,
             rate=0.0,
-        )
+        ).model_dump()
     return CurrencyResponse(
         from_currency=from_currency.upper(),
         to_currency=to_currency.upper(),
         amount=amount,
         converted=round(amount * rate, 2),
         rate=rate,
-    )
+    ).model_dump()
 
 
-@app.get("/member", response_model=MemberResponse)
+@app.get("/member", responses={200: {"model": MemberResponse}})
 def lookup_member(email: str):
     """Look up a member by email address."""
     member = MEMBERS.get(email.lower())
     if member is None:
-        return MemberResponse(email=email, name="Unknown", member_id="N/A", tier="None", points=0)
-    return MemberResponse(email=email, **member)
+        return MemberResponse(email=email, name="Unknown", member_id="N/A", tier="None", points=0).model_dump()
+    return MemberResponse(email=email, **member).model_dump()
 
 
-@app.get("/flights", response_model=FlightSearchResponse)
+@app.get("/flights", responses={200: {"model": FlightSearchResponse}})
 def search_flights(origin: str, destination: str, date: str):
     """Search for available flights between two cities on a given date (YYYY-MM-DD)."""
-    flights = []
-    for i in range(random.randint(2, 3)):
-        dep_hour = random.randint(6, 20)
-        flights.append(Flight(
-            flight_id=f"FL-{random.randint(1000, 9999)}",
-            airline=random.choice(AIRLINES),
-            origin=origin.upper(),
-            destination=destination.upper(),
+    origin, destination = origin.upper(), destination.upper()
+    # Draw every random field for all flights in one vectorized call each;
+    # tolist() hands back plain Python values for serialization
+    n = int(_np_rng.integers(2, 4))
+    flight_ids = _np_rng.integers(1000, 10000, size=n).tolist()
+    airlines = _np_rng.choice(AIRLINES, size=n).tolist()
+    dep_hours = _np_rng.integers(6, 21, size=n).tolist()
+    durations = _np_rng.integers(2, 9, size=n).tolist()
+    minutes = _np_rng.choice(MINUTES, size=2 * n).tolist()
+    prices = np.round(_np_rng.uniform(150, 1200, size=n), 2).tolist()
+    # Inputs are generated here and known-good, so skip model validation
+    flights = [
+        Flight.model_construct(
+            flight_id=f"FL-{flight_ids[i]}",
+            airline=airlines[i],
+            origin=origin,
+            destination=destination,
             date=date,
-            departure=f"{dep_hour:02d}:{random.choice(['00','15','30','45'])}",
-            arrival=f"{(dep_hour + random.randint(2, 8)) % 24:02d}:{random.choice(['00','15','30','45'])}",
-            price_usd=round(random.uniform(150, 1200), 2),
-        ))
-    return FlightSearchResponse(origin=origin.upper(), destination=destination.upper(), date=date, flights=flights)
+            departure=f"{dep_hours[i]:02d}:{minutes[2 * i]}",
+            arrival=f"{(dep_hours[i] + durations[i]) % 24:02d}:{minutes[2 * i + 1]}",
+            price_usd=prices[i],
+        )
+        for i in range(n)
+    ]
+    return FlightSearchResponse(origin=origin, destination=destination, date=date, flights=flights).model_dump()
 
 
-@app.post("/book_flight", response_model=BookingConfirmation)
+@app.post("/book_flight", responses={200: {"model": BookingConfirmation}})
 def book_flight(flight_id: str, member_id: str):
     """Book a flight for a member. Returns a confirmation code."""
-    code = "CONF-" + "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    code = "CONF-" + secrets.token_hex(3).upper()
     return BookingConfirmation(
         confirmation_code=code,
         flight_id=flight_id,
         member_id=member_id,
         status="confirmed",
-    )
+    ).model_dump()
 
 
-@app.get("/movies", response_model=MovieSearchResponse)
+@app.get("/movies", responses={200: {"model": MovieSearchResponse}})
 def search_movies(genre: str):
     """Search for currently playing movies by genre."""
     genre_lower = genre.lower()
-    movie_list = MOVIES.get(genre_lower, [])
-    movies = [Movie(genre=genre_lower, **m) for m in movie_list]
-    return MovieSearchResponse(genre=genre_lower, movies=movies)
+    return MovieSearchResponse(genre=genre_lower, movies=MOVIE_MODELS.get(genre_lower, [])).model_dump()
 
 
-@app.post("/book_movie", response_model=MovieTicket)
+@app.post("/book_movie", responses={200: {"model": MovieTicket}})
 def book_movie(movie_id: str, seats: int):
     """Book movie tickets. Returns a digital ticket stub."""
-    ticket_id = "TKT-" + "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    ticket_id = "TKT-" + secrets.token_hex(3).upper()
     return MovieTicket(
         ticket_id=ticket_id,
         movie_id=movie_id,
         seats=seats,
-        total_price_usd=round(seats * random.uniform(10, 18), 2),
+        total_price_usd=round(seats * _uniform(10, 18), 2),
         status="confirmed",
-    )
+    ).model_dump()
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    # Multi-worker needs the app as an import string. "auto" picks uvloop and
+    # httptools when installed (uvicorn[standard]) and falls back otherwise.
+    uvicorn.run(
+        "services:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("SERVICES_WORKERS", os.cpu_count() or 1)),
+        loop="auto",
+        http="auto",
+        log_level="warning",
+    )